@@ -0,0 +1,308 @@
+"""ワークアイテムをまとめて HTTP ワーカーに送る Distributor とワーカーサーバー。
+
+cosmic-ray 標準の ``http`` distributor はミュータント1件ごとに新しい接続で
+リクエストを送るため、XMT のようにテストがすぐ終わるミュータントでは通信の
+オーバーヘッドが支配的になる。こちらはワーカーごとに接続を使い回し、
+``batch-size`` 件ずつまとめて送り、結果もまとめて受け取る。
+
+設定例:
+
+    [cosmic-ray.distributor]
+    name = "xmt-batch-http"
+
+    [cosmic-ray.distributor.xmt-batch-http]
+    worker-urls = ["http://localhost:9876", "http://localhost:9877"]
+    batch-size = 20
+
+ワーカーの起動:
+
+    # 1プロセス（カレントディレクトリのコードを変異させる）
+    python -m cr_xmt.batch_http worker --port 9876
+    # ローカルで N プロセス（それぞれ作業ディレクトリのコピーで動く）
+    python -m cr_xmt.batch_http local-workers -n 4 --base-port 9876
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import contextlib
+import logging
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
+
+import aiohttp
+from aiohttp import web
+from cosmic_ray.distribution.distributor import Distributor
+from cosmic_ray.distribution.http import handle_mutate_and_test
+from cosmic_ray.mutating import mutate_and_test
+from cosmic_ray.work_item import MutationSpec, WorkItem, WorkResult, WorkerOutcome
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 10
+BATCH_PATH = "/batch"
+
+# ローカルワーカー用に作業ディレクトリをコピーするときに除外するもの
+_COPY_IGNORE = shutil.ignore_patterns(
+    ".git", "__pycache__", ".pytest_cache", ".cr-cache", "htmlcov", "*.sqlite", "*.egg-info"
+)
+
+
+def _mutation_to_dict(mutation: MutationSpec) -> dict:
+    return {
+        "module_path": str(mutation.module_path),
+        "operator": mutation.operator_name,
+        "occurrence": mutation.occurrence,
+        "start_pos": list(mutation.start_pos),
+        "end_pos": list(mutation.end_pos),
+        "operator_args": mutation.operator_args,
+        "definition_name": mutation.definition_name,
+    }
+
+
+def _mutation_from_dict(data: dict) -> MutationSpec:
+    return MutationSpec(
+        module_path=Path(data["module_path"]),
+        operator_name=data["operator"],
+        occurrence=data["occurrence"],
+        start_pos=tuple(data["start_pos"]),
+        end_pos=tuple(data["end_pos"]),
+        operator_args=data.get("operator_args") or {},
+        definition_name=data.get("definition_name"),
+    )
+
+
+def _result_to_dict(result: WorkResult) -> dict:
+    return {
+        "worker_outcome": result.worker_outcome.value,
+        "output": result.output,
+        "test_outcome": result.test_outcome.value if result.test_outcome is not None else None,
+        "diff": result.diff,
+    }
+
+
+def _result_from_dict(data: dict) -> WorkResult:
+    return WorkResult(
+        worker_outcome=data["worker_outcome"],
+        output=data["output"],
+        test_outcome=data["test_outcome"],
+        diff=data["diff"],
+    )
+
+
+# ---- Distributor ----
+
+
+class BatchHttpDistributor(Distributor):
+    """ワーカーごとに持続接続を張り、ワークアイテムを ``batch-size`` 件ずつ送る distributor。"""
+
+    def __call__(self, pending_work, test_command, timeout, distributor_config, on_task_complete):
+        urls = list(distributor_config.get("worker-urls", []))
+        if not urls:
+            raise ValueError("No worker URLs provided for BatchHttpDistributor")
+        batch_size = distributor_config.get("batch-size", DEFAULT_BATCH_SIZE)
+        if batch_size <= 0:
+            raise ValueError("batch-size must be positive.")
+        asyncio.run(self._process(pending_work, test_command, timeout, urls, batch_size, on_task_complete))
+
+    async def _process(self, pending_work, test_command, timeout, urls, batch_size, on_task_complete):
+        work = iter(pending_work)
+        # 失敗したワーカーから戻されたバッチ。生きているワーカーが優先して拾う
+        requeued: list[list[WorkItem]] = []
+        in_flight = 0
+        changed = asyncio.Condition()
+
+        async def take_batch():
+            nonlocal in_flight
+            async with changed:
+                while True:
+                    batch = requeued.pop() if requeued else list(islice(work, batch_size))
+                    if batch:
+                        in_flight += 1
+                        return batch
+                    # 処理中のバッチが戻ってくるかもしれないので、全部終わるまで待つ
+                    if in_flight == 0:
+                        return None
+                    await changed.wait()
+
+        async def finish_batch(batch=None):
+            nonlocal in_flight
+            async with changed:
+                in_flight -= 1
+                if batch is not None:
+                    requeued.append(batch)
+                changed.notify_all()
+
+        # 1ワーカーは1バッチずつ処理するので、接続はワーカーあたり1本で足りる
+        connector = aiohttp.TCPConnector(limit_per_host=1, keepalive_timeout=max(60.0, timeout or 0))
+        # テストの実行時間 × 件数だけ応答が返らないので、全体のタイムアウトは設けない
+        client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=30)
+        async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+
+            async def feed(url):
+                while batch := await take_batch():
+                    try:
+                        results = await send_batch(session, url, batch, test_command, timeout)
+                    except Exception:  # noqa # pylint: disable=broad-except
+                        # 応答しないワーカーには以後送らない。バッチは他のワーカーに回す
+                        log.exception("Error fetching results from %s; dropping the worker", url)
+                        await finish_batch(batch)
+                        return
+                    for item in batch:
+                        result = results.get(item.job_id) or WorkResult(
+                            worker_outcome=WorkerOutcome.ABNORMAL, output="No result returned by worker."
+                        )
+                        on_task_complete(item.job_id, result)
+                    await finish_batch()
+
+            await asyncio.gather(*(feed(url) for url in urls))
+
+        # ここに来て作業が残っているのは、全ワーカーが落ちたときだけ
+        if requeued:
+            result = WorkResult(worker_outcome=WorkerOutcome.ABNORMAL, output="All workers failed.")
+            for batch in requeued:
+                for item in batch:
+                    on_task_complete(item.job_id, result)
+        unsent = sum(1 for _ in work)
+        if requeued or unsent:
+            raise RuntimeError(
+                f"All workers failed: {sum(map(len, requeued))} items recorded as abnormal,"
+                f" {unsent} items left pending."
+            )
+
+
+async def send_batch(session: aiohttp.ClientSession, url, batch: list[WorkItem], test_command, timeout):
+    """ワーカーにバッチを送り ``{job_id: WorkResult}`` を返す。"""
+    parameters = {
+        "items": [
+            {"job_id": item.job_id, "mutations": [_mutation_to_dict(m) for m in item.mutations]} for item in batch
+        ],
+        "test_command": test_command,
+        "timeout": timeout,
+    }
+    log.info("Sending %d items to %s", len(batch), url)
+    async with session.post(url.rstrip("/") + BATCH_PATH, json=parameters) as resp:
+        resp.raise_for_status()
+        data = await resp.json()
+    return {entry["job_id"]: _result_from_dict(entry) for entry in data["results"]}
+
+
+# ---- ワーカー ----
+
+
+def _run_batch(args: dict) -> list[dict]:
+    results = []
+    for item in args["items"]:
+        result = mutate_and_test(
+            mutations=[_mutation_from_dict(m) for m in item["mutations"]],
+            test_command=args["test_command"],
+            timeout=args["timeout"],
+        )
+        results.append(dict(_result_to_dict(result), job_id=item["job_id"]))
+    return results
+
+
+async def handle_batch(request):
+    """バッチ版の mutate-and-test エンドポイント。"""
+    args = await request.json()
+    # mutate_and_test はブロックするので、イベントループ（接続の維持）を止めないよう別スレッドで実行
+    # ファイルを書き換えるため、同時に実行するのは1バッチだけにする
+    async with request.app["lock"]:
+        results = await asyncio.get_running_loop().run_in_executor(None, _run_batch, args)
+    return web.json_response({"results": results})
+
+
+def run_worker(port, host="127.0.0.1"):
+    """ワーカーの HTTP サーバーを起動する。
+
+    ``/batch`` に加えて、比較用に標準の ``http`` distributor 互換の ``/`` も受け付ける。
+    """
+    app = web.Application(client_max_size=64 * 2**20)
+    app["lock"] = asyncio.Lock()
+    app.add_routes([web.post(BATCH_PATH, handle_batch), web.post("/", handle_mutate_and_test)])
+    web.run_app(app, host=host, port=port, print=None)
+
+
+def _wait_for_port(port, proc, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Worker on port {port} exited with {proc.returncode}")
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=1):
+            return
+        time.sleep(0.1)
+    raise TimeoutError(f"Worker on port {port} did not start")
+
+
+@contextlib.contextmanager
+def local_workers(count: int, base_port: int, source_dir=".", log_level="INFO") -> Iterator[list[str]]:
+    """localhost に ``count`` 個のワーカープロセスを起動し、URL のリストを渡す。
+
+    ワーカーはテスト対象のファイルを書き換えるので、それぞれ ``source_dir`` のコピーで動かす。
+    """
+    source_dir = Path(source_dir).resolve()
+    with contextlib.ExitStack() as stack:
+        procs = []
+        urls = []
+        for i in range(count):
+            port = base_port + i
+            workdir = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="cr-xmt-worker-"))) / "work"
+            shutil.copytree(source_dir, workdir, ignore=_COPY_IGNORE)
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "cr_xmt.batch_http", "--log-level", log_level, "worker", "--port", str(port)],
+                cwd=workdir,
+            )
+            stack.callback(_stop, proc)
+            procs.append((port, proc))
+            urls.append(f"http://localhost:{port}")
+        for port, proc in procs:
+            _wait_for_port(port, proc)
+        yield urls
+
+
+def _stop(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batched HTTP workers for cosmic-ray.")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="run one worker in the current directory")
+    worker.add_argument("--port", type=int, required=True)
+    worker.add_argument("--host", default="127.0.0.1", help="use 0.0.0.0 to accept remote distributors")
+    local = sub.add_parser("local-workers", help="run N workers on localhost, each in a copy of --source-dir")
+    local.add_argument("-n", "--num-workers", type=int, default=4)
+    local.add_argument("--base-port", type=int, default=9876)
+    local.add_argument("--source-dir", default=".")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level)
+
+    if args.command == "worker":
+        run_worker(args.port, args.host)
+        return 0
+
+    # SIGTERM でもワーカーの停止とコピーの削除が行われるよう、例外に変換する
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with local_workers(args.num_workers, args.base_port, args.source_dir, args.log_level) as urls:
+        print("worker-urls = [" + ", ".join(f'"{url}"' for url in urls) + "]", flush=True)
+        with contextlib.suppress(KeyboardInterrupt):
+            while True:
+                time.sleep(3600)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
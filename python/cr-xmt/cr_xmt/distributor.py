@@ -0,0 +1,100 @@
+"""ミューテーション結果のキャッシュを参照しながらローカルで直列実行する Distributor。
+
+設定例:
+
+    [cosmic-ray.distributor]
+    name = "xmt-local"
+
+    [cosmic-ray.distributor.xmt-local]
+    cache-path = ".cr-cache/outcomes.sqlite"
+    max-entries = 100000
+    test-files = ["test/**/*.py"]
+    test-order = true                       # pytest のみ。殺した実績の多いテストから実行
+    history-path = ".cr-cache/test-history.sqlite"
+"""
+from __future__ import annotations
+import contextlib
+import logging
+
+from cosmic_ray.distribution.distributor import Distributor
+from cosmic_ray.mutating import mutate_and_test
+
+from .kill_order import KillHistory, format_summary, ordered_run, read_report
+from .outcome_cache import DEFAULT_MAX_ENTRIES, CacheKeyBuilder, OutcomeCache
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = ".cr-cache/outcomes.sqlite"
+DEFAULT_HISTORY_PATH = ".cr-cache/test-history.sqlite"
+DEFAULT_TEST_FILES = ("test/**/*.py",)
+
+
+class XmtLocalDistributor(Distributor):
+    """LocalDistributor にブランチ・実行をまたいだ結果キャッシュと、テストの並べ替えを加えたもの。"""
+
+    def __call__(self, pending_work, test_command, timeout, distributor_config, on_task_complete):
+        keys = CacheKeyBuilder(distributor_config.get("test-files", DEFAULT_TEST_FILES))
+        with contextlib.ExitStack() as stack:
+            cache = stack.enter_context(
+                OutcomeCache(
+                    distributor_config.get("cache-path", DEFAULT_CACHE_PATH),
+                    max_entries=distributor_config.get("max-entries", DEFAULT_MAX_ENTRIES),
+                )
+            )
+            history = None
+            if distributor_config.get("test-order", False):
+                history = stack.enter_context(
+                    KillHistory(distributor_config.get("history-path", DEFAULT_HISTORY_PATH))
+                )
+
+            for work_item in pending_work:
+                try:
+                    key = keys.key_for(work_item, test_command)
+                except Exception:  # noqa # pylint: disable=broad-except
+                    # キーが作れない(モジュールが消えた・オペレータの不具合など)ときはキャッシュを使わず実行し、
+                    # 失敗は mutate_and_test に EXCEPTION として記録させる
+                    log.exception("Unable to compute cache key for job %s; running without cache", work_item.job_id)
+                    key = None
+                result = cache.get(key) if key is not None else None
+                if result is None:
+                    if history is None:
+                        result = mutate_and_test(
+                            mutations=work_item.mutations,
+                            test_command=test_command,
+                            timeout=timeout,
+                        )
+                    else:
+                        result = _mutate_and_test_ordered(history, work_item, test_command, timeout)
+                    if key is not None:
+                        cache.put(key, result)
+                else:
+                    log.info("Cache hit for job %s", work_item.job_id)
+                on_task_complete(work_item.job_id, result)
+
+            stats = cache.stats()
+            log.info(
+                "Outcome cache: hits=%d misses=%d hit-rate=%.1f%% (cumulative %.1f%%) entries=%d/%d evictions=%d",
+                stats["run"]["hits"],
+                stats["run"]["misses"],
+                stats["run"]["hit_rate"] * 100,
+                stats["cumulative"]["hit_rate"] * 100,
+                stats["entries"],
+                stats["max_entries"],
+                stats["run"]["evictions"],
+            )
+            if history is not None:
+                log.info("Tests executed per killed mutant:\n%s", format_summary(history.summary()))
+
+
+def _mutate_and_test_ordered(history: KillHistory, work_item, test_command, timeout):
+    preferred = history.preferred_order(work_item.mutations)
+    with ordered_run(preferred) as report_path:
+        result = mutate_and_test(
+            mutations=work_item.mutations,
+            test_command=test_command,
+            timeout=timeout,
+        )
+        report = read_report(report_path)
+    if report is not None:
+        history.record(work_item.job_id, work_item.mutations, report, ordered=bool(preferred))
+    return result
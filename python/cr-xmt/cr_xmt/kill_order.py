@@ -0,0 +1,221 @@
+"""ミュータントを殺したテストの履歴と、それに基づく pytest のテスト並べ替え。
+
+``XmtLocalDistributor`` は ``PYTEST_PLUGINS`` でこのモジュールを pytest に読み込ませ、
+環境変数で並び順ファイルと結果ファイルのパスを渡す。
+
+    python -m cr_xmt.kill_order .cr-cache/test-history.sqlite
+
+で、殺されたミュータントあたりの平均実行テスト数を表示する。
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional
+
+if TYPE_CHECKING:
+    # pytest 側のプロセスでは cosmic_ray を読み込まない
+    from cosmic_ray.work_item import MutationSpec
+
+ORDER_ENV = "CR_XMT_TEST_ORDER"
+REPORT_ENV = "CR_XMT_TEST_REPORT"
+PLUGIN_NAME = "cr_xmt.kill_order"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kills (
+    scope TEXT NOT NULL,
+    nodeid TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (scope, nodeid)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    job_id TEXT NOT NULL,
+    ordered INTEGER NOT NULL,
+    executed INTEGER NOT NULL,
+    killer TEXT,
+    collection_position INTEGER
+);
+"""
+
+
+# ---- pytest プラグイン（テスト実行側のプロセスで動く） ----
+
+_state: dict = {}
+
+
+def pytest_collection_modifyitems(session, config, items):
+    _state["positions"] = {item.nodeid: i + 1 for i, item in enumerate(items)}
+    order_path = os.environ.get(ORDER_ENV)
+    if not order_path:
+        return
+    with open(order_path, encoding="utf-8") as fp:
+        preferred = json.load(fp)
+    rank = {nodeid: i for i, nodeid in enumerate(preferred)}
+    # 履歴のあるテストを先頭に、残りは収集順のまま
+    items.sort(key=lambda item: rank.get(item.nodeid, len(rank)))
+
+
+def pytest_runtest_logreport(report):
+    executed = _state.setdefault("executed", set())
+    executed.add(report.nodeid)
+    if report.failed and "killer" not in _state:
+        _state["killer"] = report.nodeid
+
+
+def pytest_sessionfinish(session, exitstatus):
+    report_path = os.environ.get(REPORT_ENV)
+    if not report_path:
+        return
+    killer = _state.get("killer")
+    with open(report_path, "w", encoding="utf-8") as fp:
+        json.dump(
+            {
+                "executed": len(_state.get("executed", ())),
+                "killer": killer,
+                "collection_position": _state.get("positions", {}).get(killer),
+            },
+            fp,
+        )
+
+
+# ---- 履歴ストア（distributor 側） ----
+
+
+def scopes_of(mutation: MutationSpec) -> tuple[str, str]:
+    """(関数スコープ, モジュールスコープ) のキーを返す。"""
+    module = str(mutation.module_path)
+    function = mutation.definition_name or f"line {mutation.start_pos[0]}"
+    return f"{module}::{function}", module
+
+
+class KillHistory:
+    """どのテストがどの関数/モジュールのミュータントを殺したかを記録する。"""
+
+    def __init__(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def preferred_order(self, mutations) -> list[str]:
+        """殺した回数の多い順のテスト。関数スコープの回数を優先し、同数はモジュールスコープで比べる。"""
+        scores: dict[str, list[int]] = {}
+        for mutation in mutations:
+            for weight, scope in enumerate(scopes_of(mutation)):
+                for nodeid, count in self._conn.execute(
+                    "SELECT nodeid, count FROM kills WHERE scope = ?", (scope,)
+                ):
+                    scores.setdefault(nodeid, [0, 0])[weight] += count
+        return sorted(scores, key=lambda nodeid: [-c for c in scores[nodeid]])
+
+    def record(self, job_id: str, mutations, report: dict, ordered: bool):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (job_id, ordered, executed, killer, collection_position) VALUES (?, ?, ?, ?, ?)",
+                (job_id, int(ordered), report["executed"], report["killer"], report["collection_position"]),
+            )
+            if report["killer"] is None:
+                return
+            for mutation in mutations:
+                for scope in scopes_of(mutation):
+                    self._conn.execute(
+                        "INSERT INTO kills (scope, nodeid, count) VALUES (?, ?, 1)"
+                        " ON CONFLICT(scope, nodeid) DO UPDATE SET count = count + 1",
+                        (scope, report["killer"]),
+                    )
+
+    def summary(self) -> dict:
+        """殺されたミュータントあたりの平均実行テスト数。
+
+        ``avg_collection_order`` は殺したテストの収集順での位置の平均で、並べ替えなしで
+        同じテストに到達するまでに実行されるテスト数（上限値）にあたる。
+        """
+        rows = self._conn.execute(
+            "SELECT ordered, COUNT(*), AVG(executed), AVG(collection_position) FROM runs"
+            " WHERE killer IS NOT NULL GROUP BY ordered"
+        ).fetchall()
+        result = {}
+        for ordered, killed, executed, position in rows:
+            result["ordered" if ordered else "unordered"] = {
+                "killed": killed,
+                "avg_executed": executed,
+                "avg_collection_order": position,
+            }
+        return result
+
+
+@contextlib.contextmanager
+def ordered_run(preferred: list[str]) -> Iterator[Path]:
+    """テスト1回分の環境変数を設定する。with ブロックに結果ファイルのパスを渡す。
+
+    ``run_tests`` は ``os.environ`` をコピーして子プロセスに渡すので、ここで書き換える。
+    """
+    saved = {name: os.environ.get(name) for name in (ORDER_ENV, REPORT_ENV, "PYTEST_PLUGINS")}
+    with tempfile.TemporaryDirectory(prefix="cr-xmt-") as tmp:
+        report_path = Path(tmp) / "report.json"
+        os.environ[REPORT_ENV] = str(report_path)
+        if preferred:
+            order_path = Path(tmp) / "order.json"
+            order_path.write_text(json.dumps(preferred), encoding="utf-8")
+            os.environ[ORDER_ENV] = str(order_path)
+        else:
+            os.environ.pop(ORDER_ENV, None)
+        plugins = [p for p in (saved["PYTEST_PLUGINS"] or "").split(",") if p]
+        os.environ["PYTEST_PLUGINS"] = ",".join(plugins + [PLUGIN_NAME])
+        try:
+            yield report_path
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def read_report(report_path: Path) -> Optional[dict]:
+    # タイムアウトなどで pytest が最後まで動かなかった場合はファイルがない
+    try:
+        with open(report_path, encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def format_summary(summary: dict) -> str:
+    lines = []
+    for label in ("unordered", "ordered"):
+        stats = summary.get(label)
+        if stats is None:
+            continue
+        lines.append(
+            f"{label}: killed {stats['killed']}, avg tests executed {stats['avg_executed']:.2f}"
+            f" (collection order {stats['avg_collection_order'] or 0:.2f})"
+        )
+    return "\n".join(lines) if lines else "no killed mutants recorded"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print average tests executed per killed mutant.")
+    parser.add_argument("history", help="test history path (distributor config 'history-path')")
+    args = parser.parse_args(argv)
+    with KillHistory(args.history) as history:
+        print(format_summary(history.summary()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+from __future__ import annotations
+import ast
+import glob
+import hashlib
+import json
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Optional
+
+import cosmic_ray.plugins
+from cosmic_ray.mutating import mutate_code
+from cosmic_ray.util import read_python_source
+from cosmic_ray.work_item import MutationSpec, TestOutcome, WorkItem, WorkResult, WorkerOutcome
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outcomes (
+    key TEXT PRIMARY KEY,
+    worker_outcome TEXT NOT NULL,
+    test_outcome TEXT,
+    output TEXT,
+    diff TEXT,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outcomes_last_used ON outcomes (last_used);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _sha256(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class OutcomeCache:
+    """ミュータントの実行結果をセッションをまたいで保存するローカルストア。
+
+    キーは :class:`CacheKeyBuilder` が作る (変異後の関数, モジュール, テスト) のハッシュ。
+    ``max_entries`` を超えたら最後に参照された順 (LRU) で古いものから削除する。
+    """
+
+    def __init__(self, path, max_entries: int = DEFAULT_MAX_ENTRIES):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive.")
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self._path))
+        self._conn.executescript(_SCHEMA)
+        self._max_entries = max_entries
+        row = self._conn.execute("SELECT COALESCE(MAX(last_used), 0) FROM outcomes").fetchone()
+        self._clock = row[0]
+        # 今回の実行分の統計（累積値は stats テーブルに保存）
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def close(self):
+        self._flush_stats()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get(self, key: str) -> Optional[WorkResult]:
+        row = self._conn.execute(
+            "SELECT worker_outcome, test_outcome, output, diff FROM outcomes WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._conn:
+            self._conn.execute("UPDATE outcomes SET last_used = ? WHERE key = ?", (self._tick(), key))
+        worker_outcome, test_outcome, output, diff = row
+        return WorkResult(worker_outcome=worker_outcome, test_outcome=test_outcome, output=output, diff=diff)
+
+    def put(self, key: str, result: WorkResult) -> bool:
+        """結果を保存する。再現性のない結果は保存せず False を返す。"""
+        if not is_cacheable(result):
+            return False
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO outcomes (key, worker_outcome, test_outcome, output, diff, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    result.worker_outcome.value,
+                    result.test_outcome.value if result.test_outcome is not None else None,
+                    result.output,
+                    result.diff,
+                    self._tick(),
+                ),
+            )
+            self.stores += 1
+            self._evict()
+        return True
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM outcomes").fetchone()
+        excess = count - self._max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM outcomes WHERE key IN (SELECT key FROM outcomes ORDER BY last_used LIMIT ?)", (excess,)
+        )
+        self.evictions += excess
+
+    def __len__(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM outcomes").fetchone()
+        return count
+
+    def _flush_stats(self):
+        with self._conn:
+            for name in ("hits", "misses", "stores", "evictions"):
+                self._conn.execute(
+                    "INSERT INTO stats (name, value) VALUES (?, ?)"
+                    " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, getattr(self, name)),
+                )
+        self.hits = self.misses = self.stores = self.evictions = 0
+
+    def stats(self) -> dict:
+        """今回の実行分と累積のヒット率などを返す。"""
+        totals = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+        run = {"hits": self.hits, "misses": self.misses, "stores": self.stores, "evictions": self.evictions}
+        cumulative = {name: totals.get(name, 0) + value for name, value in run.items()}
+        return {
+            "entries": len(self),
+            "max_entries": self._max_entries,
+            "run": dict(run, hit_rate=_hit_rate(run)),
+            "cumulative": dict(cumulative, hit_rate=_hit_rate(cumulative)),
+        }
+
+
+def _hit_rate(counts: dict) -> float:
+    lookups = counts["hits"] + counts["misses"]
+    return counts["hits"] / lookups if lookups else 0.0
+
+
+def is_cacheable(result: WorkResult) -> bool:
+    # 例外・異常終了・タイムアウト・テストコマンドの起動失敗(INCOMPETENT)は環境依存なので再利用しない
+    if result.worker_outcome == WorkerOutcome.NO_TEST:
+        return True
+    if result.worker_outcome != WorkerOutcome.NORMAL:
+        return False
+    if result.test_outcome == TestOutcome.INCOMPETENT:
+        return False
+    return result.output != "timeout"
+
+
+class CacheKeyBuilder:
+    """ワークアイテムからキャッシュキーを作る。
+
+    キーは次の3つのハッシュと test-command から決まる。
+      - 変異後の関数ソース（変異位置の範囲）と変異の位置 (occurrence, start_pos, end_pos)
+      - 変異前のモジュール全体
+      - 選択したテストファイルとそこから import されるローカルモジュール
+    """
+
+    def __init__(self, test_files: Iterable[str], root: Optional[Path] = None):
+        self._root = (root or Path.cwd()).resolve()
+        self._test_paths = sorted(
+            {Path(p) for pattern in test_files for p in glob.glob(pattern, root_dir=self._root, recursive=True)}
+        )
+        if not self._test_paths:
+            log.warning("No test files matched %s; cache keys ignore test changes.", list(test_files))
+        self._module_cache: dict[Path, str] = {}
+        self.tests_digest = self._tests_digest()
+
+    def _tests_digest(self) -> str:
+        files = sorted(_local_dependencies(self._test_paths, self._root))
+        parts = []
+        for path in files:
+            parts.append(str(path))
+            parts.append((self._root / path).read_text(encoding="utf-8"))
+        return _sha256(*parts)
+
+    def _module_source(self, module_path: Path) -> str:
+        if module_path not in self._module_cache:
+            self._module_cache[module_path] = read_python_source(self._root / module_path)
+        return self._module_cache[module_path]
+
+    def mutation_digests(self, mutation: MutationSpec) -> tuple[str, str]:
+        """(変異後の関数ハッシュ, モジュールハッシュ) を返す。"""
+        source = self._module_source(mutation.module_path)
+        operator_class = cosmic_ray.plugins.get_operator(mutation.operator_name)
+        operator = operator_class(**(mutation.operator_args or {}))
+        mutated = mutate_code(source, operator, mutation.occurrence)
+        if mutated is None:
+            function_source = ""
+        else:
+            # 変異で増減した行数だけ終了行をずらして、変異後の関数範囲を切り出す
+            original_lines = source.splitlines()
+            mutated_lines = mutated.splitlines()
+            end_row = mutation.end_pos[0] + len(mutated_lines) - len(original_lines)
+            function_source = "\n".join(mutated_lines[mutation.start_pos[0] - 1 : end_row])
+        # 同じ関数内で同じ文面の箇所を変異させると切り出した範囲が一致するので、位置もキーに含める
+        function_digest = _sha256(
+            mutation.operator_name,
+            json.dumps(mutation.operator_args or {}, sort_keys=True),
+            mutation.definition_name or "",
+            str(mutation.occurrence),
+            json.dumps([list(mutation.start_pos), list(mutation.end_pos)]),
+            function_source,
+        )
+        return function_digest, _sha256(source)
+
+    def key_for(self, work_item: WorkItem, test_command: str) -> str:
+        parts = [test_command, self.tests_digest]
+        for mutation in work_item.mutations:
+            function_digest, module_digest = self.mutation_digests(mutation)
+            parts.extend((str(mutation.module_path), function_digest, module_digest))
+        return _sha256(*parts)
+
+
+def _module_candidates(name: str, root: Path) -> Iterable[Path]:
+    parts = name.split(".")
+    # パッケージの __init__.py も依存に含める
+    for i in range(1, len(parts) + 1):
+        base = Path(*parts[:i])
+        yield base / "__init__.py"
+        if i == len(parts):
+            yield base.with_suffix(".py")
+
+
+def _local_dependencies(paths: Iterable[Path], root: Path) -> set[Path]:
+    """テストファイルから辿れるローカルの .py ファイル（root 配下）を集める。"""
+    seen: set[Path] = set()
+    stack = list(paths)
+    while stack:
+        path = stack.pop()
+        if path in seen or not (root / path).is_file():
+            continue
+        seen.add(path)
+        if path.suffix != ".py":
+            continue
+        try:
+            tree = ast.parse((root / path).read_text(encoding="utf-8"))
+        except SyntaxError:
+            continue
+        package = path.parent
+        for node in ast.walk(tree):
+            names: list[str] = []
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base = package
+                    for _ in range(node.level - 1):
+                        base = base.parent
+                    prefix = ".".join(base.parts)
+                    module = ".".join(p for p in (prefix, node.module or "") if p)
+                else:
+                    module = node.module or ""
+                names = [module] + [f"{module}.{alias.name}" for alias in node.names]
+            for name in names:
+                if name:
+                    stack.extend(c for c in _module_candidates(name, root) if (root / c).is_file())
+        # conftest.py は暗黙に読み込まれる
+        for parent in [package, *package.parents]:
+            conftest = parent / "conftest.py"
+            if (root / conftest).is_file():
+                stack.append(conftest)
+    return seen
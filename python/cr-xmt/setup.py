@@ -13,6 +13,10 @@ setup(
     entry_points={
         "cosmic_ray.operator_providers": [
             "cr_xmt = cr_xmt.provider:Provider",
-        ]
+        ],
+        "cosmic_ray.distributors": [
+            "xmt-local = cr_xmt.distributor:XmtLocalDistributor",
+            "xmt-batch-http = cr_xmt.batch_http:BatchHttpDistributor",
+        ],
     },
 )
\ No newline at end of file
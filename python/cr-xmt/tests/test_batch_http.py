@@ -0,0 +1,105 @@
+import json
+import socket
+import sys
+from pathlib import Path
+
+import pytest
+from cosmic_ray.work_item import MutationSpec, WorkItem, WorkResult, WorkerOutcome
+
+from cr_xmt.batch_http import (
+    BatchHttpDistributor,
+    _mutation_from_dict,
+    _mutation_to_dict,
+    _result_from_dict,
+    _result_to_dict,
+    local_workers,
+)
+
+MODULE = "src/mod.py"
+# 変異しても成功するコマンド。結果は常に NORMAL / SURVIVED になる
+TEST_COMMAND = f"{sys.executable} -c pass"
+
+
+def _free_port():
+    # 閉じた直後のポートには誰も listen していないので、落ちたワーカーの URL にも使う
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _work_items(count):
+    mutation = MutationSpec(
+        module_path=MODULE,
+        operator_name="core/NumberReplacer",
+        occurrence=0,
+        start_pos=(2, 11),
+        end_pos=(2, 12),
+        definition_name="f",
+    )
+    return [WorkItem.single(f"job{i}", mutation) for i in range(count)]
+
+
+def _run(urls, items, results, batch_size=2):
+    BatchHttpDistributor()(
+        items,
+        TEST_COMMAND,
+        10,
+        {"worker-urls": urls, "batch-size": batch_size},
+        lambda job_id, result: results.__setitem__(job_id, result),
+    )
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    (root / "src").mkdir(parents=True)
+    (root / MODULE).write_text("def f():\n    return 1\n")
+    return root
+
+
+def test_batch_of_dead_worker_is_requeued_to_live_worker(project):
+    with local_workers(1, _free_port(), source_dir=project, log_level="WARNING") as live:
+        # 落ちたワーカーが先に最初のバッチを取るように先頭に置く
+        results = {}
+        _run([f"http://127.0.0.1:{_free_port()}", *live], _work_items(5), results)
+
+    assert sorted(results) == [f"job{i}" for i in range(5)]
+    for result in results.values():
+        assert result.worker_outcome == WorkerOutcome.NORMAL
+        assert result.test_outcome == "survived"
+
+
+def test_all_workers_dead_records_abnormal_and_raises():
+    urls = [f"http://127.0.0.1:{_free_port()}" for _ in range(2)]
+    results = {}
+    with pytest.raises(RuntimeError, match="4 items recorded as abnormal, 1 items left pending"):
+        _run(urls, _work_items(5), results)
+
+    # 各ワーカーが1バッチずつ取って失敗し、5件目は送られないまま残る
+    assert sorted(results) == [f"job{i}" for i in range(4)]
+    for result in results.values():
+        assert result.worker_outcome == WorkerOutcome.ABNORMAL
+
+
+def test_mutation_round_trip():
+    mutation = MutationSpec(
+        module_path=Path("src/mod.py"),
+        operator_name="core/NumberReplacer",
+        occurrence=3,
+        start_pos=(2, 11),
+        end_pos=(2, 12),
+        operator_args={"value": 1},
+        definition_name="f",
+    )
+    assert _mutation_from_dict(json.loads(json.dumps(_mutation_to_dict(mutation)))) == mutation
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        WorkResult(worker_outcome="normal", test_outcome="killed", output="F", diff="-1\n+2"),
+        WorkResult(worker_outcome="abnormal", output="boom"),
+    ],
+)
+def test_result_round_trip(result):
+    assert _result_from_dict(json.loads(json.dumps(_result_to_dict(result)))) == result
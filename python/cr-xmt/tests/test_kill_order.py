@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from cosmic_ray.work_item import MutationSpec
+
+from cr_xmt.kill_order import KillHistory, ordered_run, read_report
+
+
+def _mutation(function, module="src/mod.py"):
+    return MutationSpec(
+        module_path=module,
+        operator_name="cr_xmt/xmt/function-return",
+        occurrence=0,
+        start_pos=(1, 0),
+        end_pos=(2, 0),
+        definition_name=function,
+    )
+
+
+def _report(killer, executed=3, position=3):
+    return {"executed": executed, "killer": killer, "collection_position": position}
+
+
+@pytest.fixture
+def history(tmp_path):
+    with KillHistory(tmp_path / "history.sqlite") as history:
+        yield history
+
+
+class TestKillHistory:
+    def test_no_history_gives_no_preference(self, history):
+        assert history.preferred_order([_mutation("f")]) == []
+
+    def test_function_scope_kills_rank_ahead_of_module_scope(self, history):
+        # test_a は同じモジュールの別関数 g を3回、test_b は f を1回殺している
+        for i in range(3):
+            history.record(f"g{i}", [_mutation("g")], _report("t::test_a"), ordered=False)
+        history.record("f0", [_mutation("f")], _report("t::test_b"), ordered=False)
+
+        assert history.preferred_order([_mutation("f")]) == ["t::test_b", "t::test_a"]
+        assert history.preferred_order([_mutation("g")]) == ["t::test_a", "t::test_b"]
+
+    def test_module_scope_breaks_ties(self, history):
+        history.record("f0", [_mutation("f")], _report("t::test_a"), ordered=False)
+        history.record("f1", [_mutation("f")], _report("t::test_b"), ordered=False)
+        history.record("g0", [_mutation("g")], _report("t::test_b"), ordered=False)
+
+        assert history.preferred_order([_mutation("f")]) == ["t::test_b", "t::test_a"]
+
+    def test_other_modules_are_ignored(self, history):
+        history.record("x0", [_mutation("f", module="src/other.py")], _report("t::test_a"), ordered=False)
+        assert history.preferred_order([_mutation("f")]) == []
+
+    def test_survivor_is_recorded_without_kills(self, history):
+        history.record("f0", [_mutation("f")], _report(None, executed=5, position=None), ordered=False)
+        assert history.preferred_order([_mutation("f")]) == []
+        assert history.summary() == {}
+
+    def test_summary_separates_ordered_runs(self, history):
+        history.record("f0", [_mutation("f")], _report("t::test_b", executed=4, position=4), ordered=False)
+        history.record("f1", [_mutation("f")], _report("t::test_b", executed=1, position=4), ordered=True)
+        history.record("f2", [_mutation("f")], _report("t::test_b", executed=2, position=6), ordered=True)
+
+        assert history.summary() == {
+            "unordered": {"killed": 1, "avg_executed": 4.0, "avg_collection_order": 4.0},
+            "ordered": {"killed": 2, "avg_executed": 1.5, "avg_collection_order": 5.0},
+        }
+
+
+def test_plugin_runs_preferred_tests_first(tmp_path):
+    (tmp_path / "test_sample.py").write_text(
+        "def test_one():\n    pass\n\n\ndef test_two():\n    pass\n\n\ndef test_three():\n    assert False\n"
+    )
+    saved = os.environ.get("PYTEST_PLUGINS")
+    with ordered_run(["test_sample.py::test_three"]) as report_path:
+        subprocess.run(
+            [sys.executable, "-m", "pytest", "-q", "-x", "-p", "no:cacheprovider", "test_sample.py"],
+            cwd=tmp_path,
+            capture_output=True,
+        )
+        report = read_report(report_path)
+    assert os.environ.get("PYTEST_PLUGINS") == saved
+
+    assert report == {"executed": 1, "killer": "test_sample.py::test_three", "collection_position": 3}
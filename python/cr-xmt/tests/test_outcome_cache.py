@@ -0,0 +1,154 @@
+import parso
+import pytest
+from cosmic_ray.work_item import MutationSpec, WorkItem, WorkResult
+
+from cr_xmt.outcome_cache import CacheKeyBuilder, OutcomeCache, is_cacheable
+
+MODULE = "src/mod.py"
+MODULE_SOURCE = "def f(x):\n    y = x + 1\n    z = y * 2\n    return z\n\n\ndef g():\n    return 2\n"
+TEST_SOURCE = "from src.mod import f\nfrom src import helper\n\n\ndef test_f():\n    assert f(1) == 4\n"
+
+
+def _killed():
+    return WorkResult(worker_outcome="normal", test_outcome="killed", output="F")
+
+
+def _work_item(root, occurrence=0):
+    # XMT オペレータが対象にする関数本体(suite)の位置を parso で求める
+    funcs = list(parso.parse((root / MODULE).read_text()).iter_funcdefs())
+    suite = funcs[occurrence].children[-1]
+    mutation = MutationSpec(
+        module_path=MODULE,
+        operator_name="cr_xmt/xmt/function-return",
+        occurrence=occurrence,
+        start_pos=suite.start_pos,
+        end_pos=suite.end_pos,
+        definition_name=funcs[occurrence].name.value,
+    )
+    return WorkItem.single("job", mutation)
+
+
+def _key(root, occurrence=0):
+    return CacheKeyBuilder(["test/**/*.py"], root=root).key_for(_work_item(root, occurrence), "pytest -q -x")
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "test").mkdir()
+    (tmp_path / "src" / "__init__.py").write_text("")
+    (tmp_path / MODULE).write_text(MODULE_SOURCE)
+    (tmp_path / "src" / "helper.py").write_text("VALUE = 1\n")
+    (tmp_path / "src" / "unused.py").write_text("VALUE = 1\n")
+    (tmp_path / "test" / "test_mod.py").write_text(TEST_SOURCE)
+    return tmp_path
+
+
+class TestOutcomeCache:
+    def test_get_returns_stored_result(self, tmp_path):
+        with OutcomeCache(tmp_path / "cache.sqlite") as cache:
+            assert cache.get("a") is None
+            assert cache.put("a", _killed())
+            assert cache.get("a") == _killed()
+
+    def test_evicts_least_recently_used_beyond_max_entries(self, tmp_path):
+        with OutcomeCache(tmp_path / "cache.sqlite", max_entries=2) as cache:
+            cache.put("a", _killed())
+            cache.put("b", _killed())
+            cache.get("a")  # b が最も古い参照になる
+            cache.put("c", _killed())
+            assert len(cache) == 2
+            assert cache.get("b") is None
+            assert cache.get("a") is not None
+            assert cache.get("c") is not None
+            assert cache.stats()["run"]["evictions"] == 1
+
+    def test_stats_are_accumulated_across_runs(self, tmp_path):
+        path = tmp_path / "cache.sqlite"
+        with OutcomeCache(path) as cache:
+            cache.put("a", _killed())
+            cache.get("a")
+            cache.get("b")
+        with OutcomeCache(path) as cache:
+            cache.get("a")
+            stats = cache.stats()
+        assert stats["run"] == {"hits": 1, "misses": 0, "stores": 0, "evictions": 0, "hit_rate": 1.0}
+        assert stats["cumulative"]["hits"] == 2
+        assert stats["cumulative"]["misses"] == 1
+        assert stats["cumulative"]["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_put_skips_uncacheable_result(self, tmp_path):
+        with OutcomeCache(tmp_path / "cache.sqlite") as cache:
+            assert not cache.put("a", WorkResult(worker_outcome="exception", test_outcome="incompetent"))
+            assert len(cache) == 0
+
+
+@pytest.mark.parametrize(
+    "result, expected",
+    [
+        (WorkResult(worker_outcome="normal", test_outcome="killed", output="F"), True),
+        (WorkResult(worker_outcome="normal", test_outcome="survived", output="."), True),
+        (WorkResult(worker_outcome="no-test"), True),
+        (WorkResult(worker_outcome="normal", test_outcome="killed", output="timeout"), False),
+        (WorkResult(worker_outcome="normal", test_outcome="incompetent", output="Traceback"), False),
+        (WorkResult(worker_outcome="exception", test_outcome="incompetent"), False),
+        (WorkResult(worker_outcome="abnormal"), False),
+        (WorkResult(worker_outcome="skipped"), False),
+    ],
+)
+def test_is_cacheable(result, expected):
+    assert is_cacheable(result) == expected
+
+
+class TestCacheKeyBuilder:
+    def test_key_is_stable(self, project):
+        assert _key(project) == _key(project)
+
+    def test_key_differs_per_mutant(self, project):
+        assert _key(project, 0) != _key(project, 1)
+
+    def test_key_differs_per_occurrence_with_identical_text(self, project):
+        # 同じ関数内の同じ文面の2箇所は、変異位置の行だけを切り出すと区別できない
+        (project / MODULE).write_text("def f(a, b):\n    x = a + b\n    x = a + b\n    return x\n")
+        builder = CacheKeyBuilder(["test/**/*.py"], root=project)
+        keys = set()
+        for occurrence, row in enumerate((2, 3)):
+            mutation = MutationSpec(
+                module_path=MODULE,
+                operator_name="core/ReplaceBinaryOperator_Add_Sub",
+                occurrence=occurrence,
+                start_pos=(row, 10),
+                end_pos=(row, 11),
+                definition_name="f",
+            )
+            keys.add(builder.key_for(WorkItem.single("job", mutation), "pytest -q -x"))
+        assert len(keys) == 2
+
+    def test_key_changes_when_test_file_changes(self, project):
+        before = _key(project)
+        (project / "test" / "test_mod.py").write_text(TEST_SOURCE + "\n\ndef test_more():\n    pass\n")
+        assert _key(project) != before
+
+    def test_key_changes_when_imported_module_changes(self, project):
+        before = _key(project)
+        (project / "src" / "helper.py").write_text("VALUE = 2\n")
+        assert _key(project) != before
+
+    def test_key_ignores_module_not_imported_by_tests(self, project):
+        before = _key(project)
+        (project / "src" / "unused.py").write_text("VALUE = 2\n")
+        assert _key(project) == before
+
+    def test_key_changes_when_mutated_module_changes(self, project):
+        before = _key(project)
+        (project / MODULE).write_text(MODULE_SOURCE.replace("return 2", "return 3"))
+        assert _key(project) != before
+
+    def test_function_digest_covers_only_mutated_function(self, project):
+        # f の本体3行が1行になるので、終了行をずらさないと g の行まで切り出してしまう
+        builder = CacheKeyBuilder(["test/**/*.py"], root=project)
+        before, _ = builder.mutation_digests(_work_item(project).mutations[0])
+        (project / MODULE).write_text(MODULE_SOURCE.replace("def g():", "def g(a=1):"))
+        builder = CacheKeyBuilder(["test/**/*.py"], root=project)
+        after, _ = builder.mutation_digests(_work_item(project).mutations[0])
+        assert after == before
@@ -0,0 +1,76 @@
+"""Benchmark per-item vs batched HTTP dispatch to local workers.
+
+Starts N workers on localhost (each in a copy of the current directory), then
+runs every work item of the session through the standard ``http`` distributor
+(one request and one connection per mutant) and through the batched
+``xmt-batch-http`` distributor for each batch size, printing items per second.
+Results are not written to the session.
+"""
+import argparse
+import json
+import sys
+import time
+
+from cosmic_ray.config import load_config
+from cosmic_ray.distribution.http import HttpDistributor
+from cosmic_ray.work_db import WorkDB, use_db
+from cr_xmt.batch_http import BatchHttpDistributor, local_workers
+
+
+def _run(distributor, items, test_command, timeout, config):
+    outcomes = {}
+
+    def on_task_complete(job_id, result):
+        outcomes[job_id] = result.worker_outcome.value
+
+    start = time.perf_counter()
+    distributor(items, test_command, timeout, config, on_task_complete=on_task_complete)
+    elapsed = time.perf_counter() - start
+    counts = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    return {"seconds": round(elapsed, 2), "items_per_second": round(len(items) / elapsed, 1), "outcomes": counts}
+
+
+def main(argv=None):
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("config_file", help="cosmic-ray config (test-command and timeout)")
+    parser.add_argument("session_file", help="session whose work items are dispatched (read only)")
+    parser.add_argument("-n", "--num-workers", type=int, default=4)
+    parser.add_argument("--base-port", type=int, default=9876)
+    parser.add_argument("--batch-size", type=int, action="append", help="repeatable, default: 1, 10 and 50")
+    parser.add_argument("--limit", type=int, help="dispatch only the first N work items")
+    parser.add_argument(
+        "--test-command",
+        help="override the configured test command (e.g. 'true' to measure dispatch overhead only)",
+    )
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config_file)
+    test_command = args.test_command or config.test_command
+    with use_db(args.session_file, WorkDB.Mode.open) as db:
+        items = db.work_items[: args.limit]
+
+    results = {}
+    with local_workers(args.num_workers, args.base_port, log_level="WARNING") as urls:
+        # 標準の http distributor は URL のリストを書き換えるのでコピーを渡す
+        results["per-item"] = _run(HttpDistributor(), items, test_command, config.timeout, {"worker-urls": list(urls)})
+        print(f"per-item: {results['per-item']}", file=sys.stderr)
+        for batch_size in args.batch_size or (1, 10, 50):
+            name = f"batch-{batch_size}"
+            results[name] = _run(
+                BatchHttpDistributor(),
+                items,
+                test_command,
+                config.timeout,
+                {"worker-urls": list(urls), "batch-size": batch_size},
+            )
+            print(f"{name}: {results[name]}", file=sys.stderr)
+
+    print(json.dumps({"items": len(items), "workers": args.num_workers, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Benchmark report generation on a synthetic large session.
+
+Creates a session with the cosmic-ray schema filled with N random results, then
+runs each report (report_sql.py, cr-report, cr-html) in its own process and
+prints wall time and peak RSS.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from cosmic_ray.work_db import WorkDB, use_db
+
+TOOL_DIR = Path(__file__).resolve().parent
+
+OPERATORS = (
+    "cr_xmt/xmt/function-return",
+    "core/NumberReplacer",
+    "core/AddNot",
+    "core/ReplaceComparisonOperator_Lt_LtE",
+    "core/ReplaceBinaryOperator_Add_Sub",
+)
+
+# (worker_outcome, test_outcome, output) と出現比率
+OUTCOMES = (
+    (("NORMAL", "KILLED", "F\n1 failed, 14 passed"), 60),
+    (("NORMAL", "SURVIVED", "...............\n15 passed"), 15),
+    (("SKIPPED", None, "Filtered no covered."), 20),
+    (("NORMAL", "KILLED", "timeout"), 2),
+    (None, 3),  # 未実行
+)
+
+REPORTS = {
+    "sql-text": [sys.executable, str(TOOL_DIR / "report_sql.py"), "{session}"],
+    "sql-html": [sys.executable, str(TOOL_DIR / "report_sql.py"), "--format", "html", "{session}"],
+    "sql-json": [sys.executable, str(TOOL_DIR / "report_sql.py"), "--format", "json", "{session}"],
+    "cr-report": ["cr-report", "{session}"],
+    "cr-html": ["cr-html", "{session}"],
+}
+
+
+def create_session(path, jobs, modules, functions, seed=0):
+    """Write a synthetic session with `jobs` work items to `path`."""
+    with use_db(path, WorkDB.Mode.create):
+        pass  # スキーマだけ作る
+
+    rng = random.Random(seed)
+    outcomes = [outcome for outcome, _ in OUTCOMES]
+    weights = [weight for _, weight in OUTCOMES]
+    diff = "--- mutation diff ---\n" + "\n".join(f"-    line {i}\n+    mutated {i}" for i in range(5))
+
+    conn = sqlite3.connect(str(path))
+    try:
+        batch_items, batch_specs, batch_results = [], [], []
+        for i in range(jobs):
+            job_id = uuid.UUID(int=rng.getrandbits(128)).hex
+            module = f"src/pkg{i % modules:04d}/module.py"
+            row = rng.randrange(1, 2000)
+            batch_items.append((job_id,))
+            batch_specs.append(
+                (
+                    job_id,
+                    module,
+                    rng.choice(OPERATORS),
+                    '"{}"',  # WorkDB は json.dumps した文字列を JSON 列に入れる
+                    i // modules,
+                    row,
+                    4,
+                    row + 3,
+                    0,
+                    f"function_{rng.randrange(functions)}",
+                )
+            )
+            outcome = rng.choices(outcomes, weights)[0]
+            if outcome is not None:
+                worker_outcome, test_outcome, output = outcome
+                batch_results.append((job_id, worker_outcome, test_outcome, output, diff))
+            if len(batch_items) >= 10_000 or i == jobs - 1:
+                with conn:
+                    conn.executemany("INSERT INTO work_items (job_id) VALUES (?)", batch_items)
+                    conn.executemany(
+                        "INSERT INTO mutation_specs (job_id, module_path, operator_name, operator_args, occurrence,"
+                        " start_pos_row, start_pos_col, end_pos_row, end_pos_col, definition_name)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        batch_specs,
+                    )
+                    conn.executemany(
+                        "INSERT INTO work_results (job_id, worker_outcome, test_outcome, output, diff)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        batch_results,
+                    )
+                batch_items, batch_specs, batch_results = [], [], []
+    finally:
+        conn.close()
+
+
+def measure(command, timeout):
+    """Run `command` with stdout discarded and return (seconds, peak RSS in MiB)."""
+    # 子プロセスの ru_maxrss は wait 済みの子の最大値なので、1コマンドずつ別プロセスで測る
+    probe = (
+        "import resource, subprocess, sys, time\n"
+        "start = time.perf_counter()\n"
+        "rc = subprocess.call(sys.argv[1:], stdout=subprocess.DEVNULL)\n"
+        "elapsed = time.perf_counter() - start\n"
+        "rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss\n"
+        "print(rc, elapsed, rss)\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", probe, *command], capture_output=True, text=True, timeout=timeout, check=True
+    ).stdout
+    rc, elapsed, rss = out.split()
+    if int(rc) != 0:
+        raise RuntimeError(f"{command[0]} exited with {rc}")
+    # Linux の ru_maxrss は KiB
+    return float(elapsed), int(rss) / 1024
+
+
+def main(argv=None):
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=200_000, help="number of work items")
+    parser.add_argument("--modules", type=int, default=500)
+    parser.add_argument("--functions", type=int, default=40, help="functions per module")
+    parser.add_argument(
+        "--report",
+        action="append",
+        choices=sorted(REPORTS),
+        help="reports to run (repeatable, default: all)",
+    )
+    parser.add_argument("--timeout", type=float, default=3600)
+    parser.add_argument("--session", help="keep the synthetic session at this path")
+    args = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        if args.session:
+            session = Path(args.session)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(session)
+        else:
+            session = Path(stack.enter_context(tempfile.TemporaryDirectory())) / "cr.sqlite"
+
+        start = time.perf_counter()
+        create_session(session, args.jobs, args.modules, args.functions)
+        print(
+            f"session: {args.jobs} jobs, {session.stat().st_size / 2**20:.1f} MiB,"
+            f" created in {time.perf_counter() - start:.1f}s",
+            file=sys.stderr,
+        )
+
+        results = {}
+        for name in args.report or list(REPORTS):
+            command = [part.format(session=session) for part in REPORTS[name]]
+            try:
+                elapsed, rss = measure(command, args.timeout)
+            except (subprocess.SubprocessError, RuntimeError, OSError) as exc:
+                print(f"{name}: failed ({exc})", file=sys.stderr)
+                continue
+            results[name] = {"seconds": round(elapsed, 2), "peak_rss_mib": round(rss, 1)}
+            print(f"{name}: {elapsed:.2f}s, peak RSS {rss:.1f} MiB", file=sys.stderr)
+
+    print(json.dumps({"jobs": args.jobs, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Streaming report of a Cosmic Ray session, aggregated with SQL.
+
+Unlike cr-report / cr-html this does not load the work items into Python.
+Kill / survive / skip / timeout counts per module, function and operator are
+computed by SQLite and written out row by row; survivor details are paginated.
+"""
+import argparse
+import html
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# WorkDB は Enum を名前(大文字)で保存している
+_STATUS = """
+    CASE
+        WHEN r.job_id IS NULL THEN 'pending'
+        WHEN r.worker_outcome = 'SKIPPED' THEN 'skipped'
+        WHEN r.test_outcome = 'KILLED' AND r.output = 'timeout' THEN 'timeout'
+        WHEN r.test_outcome = 'KILLED' THEN 'killed'
+        WHEN r.test_outcome = 'SURVIVED' THEN 'survived'
+        WHEN r.test_outcome = 'INCOMPETENT' THEN 'incompetent'
+        ELSE 'other'
+    END
+"""
+
+STATUSES = ("killed", "survived", "skipped", "timeout", "incompetent", "other", "pending")
+
+GROUPS = {
+    "module": ("m.module_path",),
+    "function": ("m.module_path", "m.definition_name"),
+    "operator": ("m.operator_name",),
+}
+
+_COUNTS = ",\n".join(f"COALESCE(SUM(status = '{status}'), 0) AS {status}" for status in STATUSES)
+
+
+def _aggregate_sql(columns):
+    keys = ", ".join(columns)
+    return f"""
+        SELECT {keys}, COUNT(*) AS total,
+        {_COUNTS}
+        FROM (
+            SELECT m.module_path, m.definition_name, m.operator_name, {_STATUS} AS status
+            FROM mutation_specs AS m LEFT JOIN work_results AS r ON r.job_id = m.job_id
+        ) AS m
+        GROUP BY {keys}
+        ORDER BY {keys}
+    """
+
+
+_SUMMARY_SQL = f"""
+    SELECT COUNT(*) AS total,
+    {_COUNTS}
+    FROM (
+        SELECT {_STATUS} AS status
+        FROM work_items AS w LEFT JOIN work_results AS r ON r.job_id = w.job_id
+    )
+"""
+
+_SURVIVORS_SQL = """
+    SELECT m.job_id, m.module_path, m.definition_name, m.operator_name, m.occurrence,
+           m.start_pos_row, m.start_pos_col, m.end_pos_row, m.end_pos_col, r.diff
+    FROM work_results AS r JOIN mutation_specs AS m ON m.job_id = r.job_id
+    WHERE r.test_outcome = 'SURVIVED'
+    ORDER BY m.module_path, m.start_pos_row, m.job_id
+    LIMIT ? OFFSET ?
+"""
+
+
+def _connect(session_file):
+    # 読み取り専用で開く（レポート中にセッションを壊さない）
+    conn = sqlite3.connect(f"{Path(session_file).resolve().as_uri()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _kill_rate(row):
+    # スキップ・未実行は分母に含めない
+    tested = row["killed"] + row["timeout"] + row["survived"]
+    return (row["killed"] + row["timeout"]) / tested * 100 if tested else None
+
+
+def summary(conn):
+    return dict(conn.execute(_SUMMARY_SQL).fetchone())
+
+
+def aggregates(conn, group):
+    """Yield one dict per group, as SQLite produces them."""
+    names = [column.split(".")[1] for column in GROUPS[group]]
+    for row in conn.execute(_aggregate_sql(GROUPS[group])):
+        item = {name: row[name] for name in names}
+        item.update({key: row[key] for key in ("total",) + STATUSES})
+        item["kill_rate"] = _kill_rate(row)
+        yield item
+
+
+def survivors(conn, page, page_size, show_diff):
+    for row in conn.execute(_SURVIVORS_SQL, (page_size, (page - 1) * page_size)):
+        item = {
+            "job_id": row["job_id"],
+            "module_path": row["module_path"],
+            "definition_name": row["definition_name"],
+            "operator_name": row["operator_name"],
+            "occurrence": row["occurrence"],
+            "start_pos": [row["start_pos_row"], row["start_pos_col"]],
+            "end_pos": [row["end_pos_row"], row["end_pos_col"]],
+        }
+        if show_diff:
+            item["diff"] = row["diff"]
+        yield item
+
+
+def _fmt_rate(rate):
+    return "-" if rate is None else f"{rate:.2f}%"
+
+
+def write_text(conn, out, args):
+    s = summary(conn)
+    out.write(f"total jobs: {s['total']}\n")
+    out.write(" ".join(f"{status}: {s[status]}" for status in STATUSES) + "\n")
+    out.write(f"kill rate: {_fmt_rate(_kill_rate(s))}\n")
+    for group in args.group_by:
+        out.write(f"\n=== by {group} ===\n")
+        for item in aggregates(conn, group):
+            label = " ".join(str(item[name]) for name in (c.split(".")[1] for c in GROUPS[group]))
+            counts = " ".join(f"{status}={item[status]}" for status in STATUSES if item[status])
+            out.write(f"{label}: total={item['total']} {counts} kill-rate={_fmt_rate(item['kill_rate'])}\n")
+    out.write(f"\n=== survivors (page {args.page}, {args.page_size} per page) ===\n")
+    for item in survivors(conn, args.page, args.page_size, args.show_diff):
+        out.write(
+            f"[job-id] {item['job_id']} {item['module_path']}:{item['start_pos'][0]}"
+            f" {item['definition_name']} {item['operator_name']} {item['occurrence']}\n"
+        )
+        if args.show_diff:
+            out.write(f"{item['diff']}\n")
+
+
+def write_json(conn, out, args):
+    # 行ごとに書き出して、全件をメモリに持たない
+    out.write('{"summary": ')
+    out.write(json.dumps(summary(conn)))
+    for group in args.group_by:
+        out.write(f', "by_{group}": [')
+        for i, item in enumerate(aggregates(conn, group)):
+            out.write(("," if i else "") + "\n" + json.dumps(item))
+        out.write("]")
+    out.write(f', "survivors": {{"page": {args.page}, "page_size": {args.page_size}, "items": [')
+    for i, item in enumerate(survivors(conn, args.page, args.page_size, args.show_diff)):
+        out.write(("," if i else "") + "\n" + json.dumps(item))
+    out.write("]}}\n")
+
+
+def write_html(conn, out, args):
+    e = html.escape
+    out.write(
+        '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8"><title>Cosmic Ray Report</title>'
+        "<style>table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:2px 6px}"
+        "td.n{text-align:right}</style></head><body>\n<h1>Cosmic Ray Report</h1>\n"
+    )
+    s = summary(conn)
+    out.write("<h2>Summary</h2>\n<table><tr><th>total</th>")
+    out.write("".join(f"<th>{status}</th>" for status in STATUSES) + "<th>kill rate</th></tr>\n<tr>")
+    out.write("".join(f'<td class="n">{s[key]}</td>' for key in ("total",) + STATUSES))
+    out.write(f'<td class="n">{_fmt_rate(_kill_rate(s))}</td></tr></table>\n')
+    for group in args.group_by:
+        names = [column.split(".")[1] for column in GROUPS[group]]
+        out.write(f"<h2>By {group}</h2>\n<table><tr>")
+        out.write("".join(f"<th>{name}</th>" for name in names + ["total", *STATUSES, "kill rate"]))
+        out.write("</tr>\n")
+        for item in aggregates(conn, group):
+            out.write("<tr>" + "".join(f"<td>{e(str(item[name]))}</td>" for name in names))
+            out.write("".join(f'<td class="n">{item[key]}</td>' for key in ("total",) + STATUSES))
+            out.write(f'<td class="n">{_fmt_rate(item["kill_rate"])}</td></tr>\n')
+        out.write("</table>\n")
+    out.write(f"<h2>Survivors (page {args.page}, {args.page_size} per page)</h2>\n")
+    for item in survivors(conn, args.page, args.page_size, args.show_diff):
+        out.write(
+            f"<h3>{e(item['job_id'])}</h3><p>{e(item['module_path'])}:{item['start_pos'][0]}"
+            f" {e(str(item['definition_name']))} {e(item['operator_name'])} {item['occurrence']}</p>\n"
+        )
+        if args.show_diff and item["diff"]:
+            out.write(f"<pre>{e(item['diff'])}</pre>\n")
+    out.write("</body></html>\n")
+
+
+WRITERS = {"text": write_text, "json": write_json, "html": write_html}
+
+
+def main(argv=None):
+    """Print an SQL-aggregated report of the session."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("session_file", help="cosmic-ray session (cr.sqlite)")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="text")
+    parser.add_argument(
+        "--group-by",
+        action="append",
+        choices=sorted(GROUPS),
+        help="aggregate level (repeatable, default: module, function and operator)",
+    )
+    parser.add_argument("--page", type=int, default=1, help="survivor page to show (1-based)")
+    parser.add_argument("--page-size", type=int, default=100, help="survivors per page (0 to omit)")
+    parser.add_argument("--show-diff", action="store_true", help="include diffs of survivors")
+    args = parser.parse_args(argv)
+    if args.page < 1 or args.page_size < 0:
+        parser.error("--page must be >= 1 and --page-size >= 0")
+    args.group_by = args.group_by or list(GROUPS)
+
+    conn = _connect(args.session_file)
+    try:
+        WRITERS[args.format](conn, sys.stdout, args)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
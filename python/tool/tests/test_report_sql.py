@@ -0,0 +1,117 @@
+import sys
+from pathlib import Path
+
+import pytest
+from cosmic_ray.work_db import WorkDB, use_db
+from cosmic_ray.work_item import MutationSpec, WorkItem, WorkResult
+
+# tool/ はパッケージではないのでスクリプトを直接 import する
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import report_sql  # noqa: E402 # pylint: disable=wrong-import-position
+
+KILLED = WorkResult(worker_outcome="normal", test_outcome="killed", output="F")
+SURVIVED = WorkResult(worker_outcome="normal", test_outcome="survived", output=".", diff="-1\n+2")
+TIMEOUT = WorkResult(worker_outcome="normal", test_outcome="killed", output="timeout")
+SKIPPED = WorkResult(worker_outcome="skipped", output="Filtered no covered.")
+INCOMPETENT = WorkResult(worker_outcome="exception", test_outcome="incompetent", output="Traceback")
+
+# (job_id, module, 関数, オペレータ, 開始行, 結果。None は未実行)
+JOBS = [
+    ("k1", "src/a.py", "f", "core/NumberReplacer", 2, KILLED),
+    ("t1", "src/a.py", "f", "core/NumberReplacer", 3, TIMEOUT),
+    ("s3", "src/a.py", "g", "core/AddNot", 12, SURVIVED),
+    ("s1", "src/a.py", "g", "core/NumberReplacer", 10, SURVIVED),
+    ("s2", "src/b.py", "h", "core/NumberReplacer", 1, SURVIVED),
+    ("x1", "src/b.py", "h", "core/AddNot", 2, SKIPPED),
+    ("i1", "src/b.py", "h", "core/AddNot", 3, INCOMPETENT),
+    ("p1", "src/b.py", "h", "core/AddNot", 4, None),
+]
+
+
+def _create(path, jobs):
+    with use_db(path, WorkDB.Mode.create) as db:
+        for job_id, module, function, operator, row, result in jobs:
+            mutation = MutationSpec(
+                module_path=module,
+                operator_name=operator,
+                occurrence=0,
+                start_pos=(row, 4),
+                end_pos=(row, 8),
+                definition_name=function,
+            )
+            db.add_work_item(WorkItem.single(job_id, mutation))
+            if result is not None:
+                db.set_result(job_id, result)
+    return report_sql._connect(path)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = _create(tmp_path / "cr.sqlite", JOBS)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def empty(tmp_path):
+    conn = _create(tmp_path / "empty.sqlite", [])
+    yield conn
+    conn.close()
+
+
+def _counts(**counts):
+    return {status: counts.get(status, 0) for status in report_sql.STATUSES}
+
+
+def test_summary(conn):
+    assert report_sql.summary(conn) == dict(
+        _counts(killed=1, timeout=1, survived=3, skipped=1, incompetent=1, pending=1), total=8
+    )
+
+
+def test_aggregates_by_function(conn):
+    rows = {(row["module_path"], row["definition_name"]): row for row in report_sql.aggregates(conn, "function")}
+
+    assert list(rows) == [("src/a.py", "f"), ("src/a.py", "g"), ("src/b.py", "h")]
+    assert rows["src/a.py", "f"]["killed"] == 1
+    assert rows["src/a.py", "f"]["timeout"] == 1
+    assert rows["src/a.py", "f"]["kill_rate"] == 100.0
+    assert rows["src/a.py", "g"]["kill_rate"] == 0.0
+    h = rows["src/b.py", "h"]
+    assert {key: h[key] for key in ("total",) + report_sql.STATUSES} == dict(
+        _counts(survived=1, skipped=1, incompetent=1, pending=1), total=4
+    )
+
+
+def test_aggregates_by_operator(conn):
+    rows = {row["operator_name"]: row for row in report_sql.aggregates(conn, "operator")}
+
+    assert rows["core/NumberReplacer"]["total"] == 4
+    # スキップ・未実行は分母に入らない: 殺した2件 / (2 + 生存2件)
+    assert rows["core/NumberReplacer"]["kill_rate"] == 50.0
+    assert rows["core/AddNot"]["kill_rate"] == 0.0
+
+
+def test_survivors_are_paginated_in_module_and_line_order(conn):
+    pages = [[item["job_id"] for item in report_sql.survivors(conn, page, 2, False)] for page in (1, 2, 3)]
+    assert pages == [["s1", "s3"], ["s2"], []]
+
+
+def test_survivors_show_diff(conn):
+    (item,) = report_sql.survivors(conn, 1, 1, True)
+    assert item["diff"] == "-1\n+2"
+    assert item["start_pos"] == [10, 4]
+
+
+def test_empty_session(empty):
+    assert report_sql.summary(empty) == dict(_counts(), total=0)
+    assert report_sql._kill_rate(report_sql.summary(empty)) is None
+    assert list(report_sql.aggregates(empty, "module")) == []
+    assert list(report_sql.survivors(empty, 1, 100, True)) == []
+
+
+@pytest.mark.parametrize("fmt", sorted(report_sql.WRITERS))
+def test_main_on_empty_session(tmp_path, capsys, fmt):
+    _create(tmp_path / "empty.sqlite", []).close()
+    assert report_sql.main([str(tmp_path / "empty.sqlite"), "--format", fmt]) == 0
+    assert "0" in capsys.readouterr().out